@@ -3,8 +3,19 @@ import sys
 import subprocess
 import logging
 import hashlib
+import time
+import heapq
+import shutil
+import tempfile
+from itertools import chain, groupby
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from collections import defaultdict
 from datetime import datetime
+from similarity import is_text_file, read_text, minhash_signature, find_similar_clusters, MAX_TEXT_SIZE
+from results_store import ResultsStore
+from external_grouping import PathSpool, ExternalSorter, collisions, distinct_inodes, SIZE_RECORD, HASH_RECORD
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                              QFileDialog, QLabel, QTreeWidget, QTreeWidgetItem, QMessageBox, 
                              QCheckBox, QScrollArea, QComboBox, QSplitter,
@@ -13,61 +24,488 @@ from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QH
 from PyQt6.QtGui import QFont, QIcon, QColor, QPixmap
 from PyQt6.QtCore import Qt, QTimer, QPropertyAnimation, QEasingCurve, QSize, QFileInfo, QThread, QObject, pyqtSignal, pyqtSlot
 
+class ParallelWalker:
+    def __init__(self, folder, accepts_file, workers=16, queue_size=10000, track_visited=True):
+        self.folder = folder
+        self.accepts_file = accepts_file
+        self.workers = workers
+        self.track_visited = track_visited
+        self.files = queue.Queue(maxsize=queue_size)
+        self._isRunning = True
+        self._visited = set()
+        self._visited_lock = threading.Lock()
+
+    def start(self):
+        threading.Thread(target=self.walk, daemon=True).start()
+
+    def __iter__(self):
+        while self._isRunning:
+            try:
+                item = self.files.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is None:
+                return
+            yield item
+
+    def walk(self):
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                pending = {pool.submit(self.list_dir, self.folder)}
+                while pending and self._isRunning:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        try:
+                            subdirs = future.result()
+                        except Exception as e:
+                            print(f"Error during file search: {str(e)}")
+                            continue
+                        for subdir in subdirs:
+                            pending.add(pool.submit(self.list_dir, subdir))
+                for future in pending:
+                    future.cancel()
+        finally:
+            self.put(None)
+
+    def list_dir(self, path):
+        if not self._isRunning or (self.track_visited and not self.first_visit(path)):
+            return []
+
+        subdirs = []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if not self._isRunning:
+                        break
+                    try:
+                        # Like os.walk, list symlinked directories but never descend into them
+                        if entry.is_dir():
+                            if not entry.is_symlink():
+                                subdirs.append(entry.path)
+                            continue
+                        if not self.accepts_file(entry.name):
+                            continue
+                        self.put((entry.path, entry.stat()))
+                    except Exception as e:
+                        print(f"Error processing file {entry.name}: {str(e)}")
+        except Exception as e:
+            print(f"Error listing folder {path}: {str(e)}")
+        return subdirs
+
+    def first_visit(self, path):
+        # Bind mounts and junctions can still lead back to a folder we've already listed
+        try:
+            st = os.stat(path)
+        except OSError as e:
+            print(f"Error listing folder {path}: {str(e)}")
+            return False
+        key = (st.st_dev, st.st_ino)
+        with self._visited_lock:
+            if key in self._visited:
+                return False
+            self._visited.add(key)
+        return True
+
+    def put(self, item):
+        # Block while the hashing side catches up, but give up once the scan is stopped
+        while self._isRunning:
+            try:
+                self.files.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def stop(self):
+        self._isRunning = False
+
 class FileHasher(QObject):
     progress = pyqtSignal(int)
-    finished = pyqtSignal(dict)
-
-    def __init__(self, folder, file_types=None):
+    groups_found = pyqtSignal(list)
+    budget_exhausted = pyqtSignal(int, 'qint64')
+    similar_found = pyqtSignal(list)
+    similarity_cut_short = pyqtSignal(int)
+    finished = pyqtSignal(int)
+
+    BLOCK_SIZE = 65536
+    BATCH_SIZE = 50
+    BATCH_INTERVAL = 0.25
+    WALK_QUEUE_SIZE = 10000
+
+    def __init__(self, folder, file_types=None, time_budget=None, byte_budget=None, walk_workers=None,
+                 similarity_threshold=None, memory_cap=None):
         super().__init__()
         self.folder = folder
         self.file_types = file_types
+        self.time_budget = time_budget
+        self.byte_budget = byte_budget
+        self.walk_workers = walk_workers
+        self.similarity_threshold = similarity_threshold
+        self.memory_cap = memory_cap
         self._isRunning = True
+        self._walker = None
+        self._partial_hashes = {}
+        self._text_files = []
+        self._exact_copies = set()
+        self._started = None
+        self.bytes_read = 0
+        self._batch = []
+        self._last_flush = time.monotonic()
 
     @pyqtSlot()
     def run(self):
-        duplicates = defaultdict(list)
-        total_files = sum([len(files) for r, d, files in os.walk(self.folder)])
-        processed_files = 0
+        group_count = 0
+        self._started = time.monotonic()
+        self.bytes_read = 0
 
         try:
-            for root, _, files in os.walk(self.folder):
-                for filename in files:
-                    if not self._isRunning:
-                        break
+            if self.memory_cap is not None:
+                group_count = self.group_external()
+            else:
+                group_count = self.group_in_memory()
 
-                    try:
-                        if self.file_types and not any(filename.lower().endswith(ft.lower()) for ft in self.file_types):
-                            continue
-                        filepath = os.path.join(root, filename)
-                        file_hash = self.hash_file(filepath)
-                        file_size = os.path.getsize(filepath)
-                        duplicates[file_hash].append((filepath, file_size))
-                        processed_files += 1
-                        self.progress.emit(int(processed_files / total_files * 100))
-                    except Exception as e:
-                        print(f"Error processing file {filename}: {str(e)}")
-                if not self._isRunning:
-                    break
+            self.flush_groups()
+            if self.similarity_threshold is not None and self._isRunning:
+                self.find_similar()
         except Exception as e:
             print(f"Error during file search: {str(e)}")
 
-        self.finished.emit(duplicates)
+        self.flush_groups()
+        self.finished.emit(group_count)
+
+    def group_in_memory(self):
+        group_count = 0
+        size_buckets = self.collect_sizes()
+
+        # Work through the buckets with the most reclaimable space first, so
+        # a budgeted scan spends its time on the biggest wins.
+        candidates = [(-size * (len(paths) - 1), size, paths)
+                      for size, paths in size_buckets.items() if len(paths) > 1]
+        heapq.heapify(candidates)
+        total_files = sum(len(paths) for _, _, paths in candidates)
+        processed_files = 0
+
+        while candidates and self._isRunning:
+            if self.is_over_budget():
+                self.report_unverified(candidates)
+                break
+            potential, size, paths = heapq.heappop(candidates)
+            groups = self.find_duplicates(size, paths)
+            if groups is None:
+                if self._isRunning:
+                    heapq.heappush(candidates, (potential, size, paths))
+                    self.report_unverified(candidates)
+                break
+            for group in groups:
+                self.add_group(group)
+                group_count += 1
+            processed_files += len(paths)
+            self.progress.emit(int(processed_files / total_files * 100))
+            self.flush_if_due()
+        return group_count
+
+    def group_external(self):
+        # Every stage goes through sorted run files on disk, so memory stays under
+        # memory_cap however many files there are. Similarity search is skipped as
+        # its candidate list would have to live in memory.
+        group_count = 0
+        temp_dir = tempfile.mkdtemp(prefix="duplicate_scan_")
+        paths = PathSpool(temp_dir)
+        sorters = []
+        try:
+            sizes = ExternalSorter(SIZE_RECORD, temp_dir, self.memory_cap)
+            sorters.append(sizes)
+            for filepath, st in self.iter_files():
+                sizes.add((-st.st_size, st.st_dev & 0xFFFFFFFFFFFFFFFF, st.st_ino & 0xFFFFFFFFFFFFFFFF,
+                           paths.add(filepath)))
+            if not self._isRunning:
+                return group_count
+            self.progress.emit(25)
+
+            # Files that differ in their first block can't be duplicates, so only
+            # read the rest of a file when another one of the same size matches it.
+            partials = ExternalSorter(HASH_RECORD, temp_dir, self.memory_cap)
+            sorters.append(partials)
+            if not self.hash_external(sizes, lambda record: record[0], partials, paths,
+                                      lambda record: self.partial_hash(paths.get(record[-1])),
+                                      unverified_target=True):
+                return group_count
+            self.progress.emit(50)
+
+            fulls = ExternalSorter(HASH_RECORD, temp_dir, self.memory_cap)
+            sorters.append(fulls)
+            finished = self.hash_external(partials, lambda record: record[:2], fulls, paths,
+                                          lambda record: self.full_hash(record, paths))
+            if not self._isRunning:
+                return group_count
+            self.progress.emit(75)
+
+            # Even when the budget ran out above, every group of matching full hashes
+            # found so far is a confirmed set of duplicates. Extra links to the same
+            # file free nothing, and members go back into walk order so Delete All
+            # keeps the same copy as an in-memory scan.
+            for _, records in groupby(collisions(fulls.sorted_records(), lambda record: record[:2]),
+                                      lambda record: record[:2]):
+                if not self._isRunning:
+                    break
+                records = sorted(distinct_inodes(records), key=lambda record: record[-1])
+                if len(records) < 2:
+                    continue
+                self.add_group([(paths.get(record[-1]), -record[0]) for record in records])
+                group_count += 1
+            if finished:
+                self.progress.emit(100)
+        finally:
+            for sorter in sorters:
+                sorter.close()
+            paths.close()
+            shutil.rmtree(temp_dir, ignore_errors=True)
+        return group_count
+
+    def hash_external(self, source, key, target, paths, hash_func, unverified_target=False):
+        # Hard links sort next to each other, so each inode is only read once
+        last_inode = None
+        last_digest = None
+        records = collisions(source.sorted_records(), key)
+        for record in records:
+            if not self._isRunning:
+                return False
+            if self.is_over_budget():
+                self.report_unverified_records(chain([record], records), key,
+                                               target if unverified_target else None)
+                return False
+            size, dev, ino = record[0], record[-3], record[-2]
+            if ino and (size, dev, ino) == last_inode:
+                digest = last_digest
+            else:
+                try:
+                    file_hash = hash_func(record)
+                except Exception as e:
+                    print(f"Error processing file {paths.get(record[-1])}: {str(e)}")
+                    continue
+                if file_hash is None:
+                    if self._isRunning:
+                        self.report_unverified_records(chain([record], records), key,
+                                                       target if unverified_target else None)
+                    return False
+                digest = bytes.fromhex(file_hash)
+                last_inode, last_digest = (size, dev, ino), digest
+            target.add((size, digest, dev, ino, record[-1]))
+        return True
+
+    def full_hash(self, record, paths):
+        if -record[0] <= self.BLOCK_SIZE:
+            return record[1].hex()
+        return self.hash_file(paths.get(record[-1]))
+
+    def report_unverified_records(self, records, key, hashed=None):
+        unverified_files = 0
+        potential_bytes = 0
+        stopped_size = None
+        for _, group in groupby(records, key):
+            size, count = self.count_inodes(group)
+            unverified_files += count
+            potential_bytes += size * (count - 1)
+            if stopped_size is None:
+                stopped_size = size
+
+        # Files whose first block was already read are still unverified if it matched
+        # another file's, or if the rest of their size bucket was never read.
+        if hashed is not None:
+            for _, group in groupby(hashed.sorted_records(), lambda record: record[:2]):
+                size, count = self.count_inodes(group)
+                if count > 1 or size == stopped_size:
+                    unverified_files += count
+                    potential_bytes += size * (count - 1)
+        self.budget_exhausted.emit(unverified_files, potential_bytes)
+
+    def count_inodes(self, records):
+        size = 0
+        count = 0
+        for record in distinct_inodes(records):
+            size = -record[0]
+            count += 1
+        return size, count
+
+    def track_text_file(self, filepath, size):
+        if self.similarity_threshold is not None and 0 < size <= MAX_TEXT_SIZE and is_text_file(filepath):
+            self._text_files.append((filepath, size))
+
+    def find_similar(self):
+        # Exact copies are already listed as duplicate groups; keeping only the first
+        # of each stops them from showing up again as 100% similar clusters.
+        signatures = []
+        for checked, (filepath, size) in enumerate(self._text_files):
+            if not self._isRunning:
+                return
+            if self.is_over_budget():
+                # Still cluster what was read so far, and say how much was left out
+                self.similarity_cut_short.emit(len(self._text_files) - checked)
+                break
+            if filepath in self._exact_copies:
+                continue
+            try:
+                data = read_text(filepath)
+                self.bytes_read += size
+                signature = minhash_signature(data)
+            except Exception as e:
+                print(f"Error processing file {filepath}: {str(e)}")
+                continue
+            if signature is not None:
+                signatures.append(((filepath, size), signature))
+
+        clusters = find_similar_clusters(signatures, self.similarity_threshold)
+        for start in range(0, len(clusters), self.BATCH_SIZE):
+            if not self._isRunning:
+                return
+            self.similar_found.emit(clusters[start:start + self.BATCH_SIZE])
+
+    def is_over_budget(self):
+        if self.time_budget is not None and time.monotonic() - self._started >= self.time_budget:
+            return True
+        if self.byte_budget is not None and self.bytes_read >= self.byte_budget:
+            return True
+        return False
+
+    def report_unverified(self, candidates):
+        unverified_files = sum(len(paths) for _, _, paths in candidates)
+        potential_bytes = -sum(potential for potential, _, _ in candidates)
+        self.budget_exhausted.emit(unverified_files, potential_bytes)
+
+    def accepts_file(self, filename):
+        return not self.file_types or any(filename.lower().endswith(ft.lower()) for ft in self.file_types)
+
+    def iter_files(self):
+        if self.walk_workers and self.walk_workers > 1:
+            # The visited set grows with every folder, so it's left out under a memory
+            # cap; like os.walk, symlinked folders are still never followed.
+            self._walker = ParallelWalker(self.folder, self.accepts_file, self.walk_workers, self.WALK_QUEUE_SIZE,
+                                          track_visited=self.memory_cap is None)
+            self._walker.start()
+            # Stop the walker however iteration ends, or its threads stay blocked on the full queue
+            try:
+                for filepath, st in self._walker:
+                    if not self._isRunning:
+                        return
+                    yield filepath, st
+            finally:
+                self._walker.stop()
+            return
+
+        for root, _, files in os.walk(self.folder):
+            for filename in files:
+                if not self._isRunning:
+                    return
+                if not self.accepts_file(filename):
+                    continue
+                filepath = os.path.join(root, filename)
+                try:
+                    st = os.stat(filepath)
+                except Exception as e:
+                    print(f"Error processing file {filename}: {str(e)}")
+                    continue
+                yield filepath, st
+
+    def collect_sizes(self):
+        # With the parallel walker, hash first blocks of size collisions while it waits
+        # on directory listings. Skipped under a budget so it goes to the biggest wins first.
+        eager_hashing = (self.walk_workers and self.walk_workers > 1
+                         and self.byte_budget is None and self.time_budget is None)
+
+        size_buckets = defaultdict(list)
+        for filepath, st in self.iter_files():
+            size = st.st_size
+            paths = size_buckets[size]
+            paths.append(filepath)
+            self.track_text_file(filepath, size)
+            if eager_hashing and len(paths) > 1 and size > 0:
+                for candidate in (paths if len(paths) == 2 else paths[-1:]):
+                    try:
+                        self._partial_hashes[candidate] = self.partial_hash(candidate)
+                    except Exception:
+                        pass
+        return size_buckets
+
+    def find_duplicates(self, size, paths):
+        # Files that differ in their first block can't be duplicates, so only
+        # read the rest of a file when another one of the same size matches it.
+        partial_groups = self.group_by_hash(paths, self.partial_hash)
+        if partial_groups is None:
+            return None
+        if size <= self.BLOCK_SIZE:
+            full_groups = partial_groups
+        else:
+            full_groups = []
+            for group in partial_groups:
+                groups = self.group_by_hash(group, self.hash_file)
+                if groups is None:
+                    return None
+                full_groups.extend(groups)
+        return [[(filepath, size) for filepath in group] for group in full_groups]
+
+    def group_by_hash(self, paths, hash_func):
+        groups = defaultdict(list)
+        for filepath in paths:
+            if not self._isRunning or self.is_over_budget():
+                return None
+            self.flush_if_due()
+            try:
+                file_hash = hash_func(filepath)
+            except Exception as e:
+                print(f"Error processing file {filepath}: {str(e)}")
+                continue
+            if file_hash is None:
+                return None
+            groups[file_hash].append(filepath)
+        return [group for group in groups.values() if len(group) > 1]
+
+    def add_group(self, group):
+        self._batch.append(group)
+        if self.similarity_threshold is not None:
+            self._exact_copies.update(filepath for filepath, _ in group[1:])
+        if len(self._batch) >= self.BATCH_SIZE:
+            self.flush_groups()
+        else:
+            self.flush_if_due()
+
+    def flush_if_due(self):
+        # Called while hashing too, so a group found just before a slow bucket
+        # doesn't wait for that bucket to finish.
+        if self._batch and time.monotonic() - self._last_flush >= self.BATCH_INTERVAL:
+            self.flush_groups()
+
+    def flush_groups(self):
+        if self._batch:
+            self.groups_found.emit(self._batch)
+            self._batch = []
+        self._last_flush = time.monotonic()
+
+    def partial_hash(self, filepath):
+        if filepath in self._partial_hashes:
+            return self._partial_hashes.pop(filepath)
+        with open(filepath, "rb") as f:
+            fb = f.read(self.BLOCK_SIZE)
+        self.bytes_read += len(fb)
+        return hashlib.sha256(fb).hexdigest()
 
     def hash_file(self, filepath):
-        BLOCK_SIZE = 65536
         file_hash = hashlib.sha256()
         with open(filepath, "rb") as f:
-            fb = f.read(BLOCK_SIZE)
+            fb = f.read(self.BLOCK_SIZE)
             while len(fb) > 0:
-                if not self._isRunning:
+                # Large files are hashed first, so stop mid-file rather than overshoot the budget
+                if not self._isRunning or self.is_over_budget():
                     return None
+                self.flush_if_due()
                 file_hash.update(fb)
-                fb = f.read(BLOCK_SIZE)
+                self.bytes_read += len(fb)
+                fb = f.read(self.BLOCK_SIZE)
         return file_hash.hexdigest()
 
     @pyqtSlot()
     def stop(self):
         self._isRunning = False
+        if self._walker:
+            self._walker.stop()
 
 class AnimatedButton(QPushButton):
     def __init__(self, text, parent=None):
@@ -113,6 +551,9 @@ class CancellableProgressBar(QWidget):
             self.setValue(0)
 
 class AdvancedDuplicateFileFinder(QMainWindow):
+    PARALLEL_WALK_WORKERS = 32
+    SIMILARITY_THRESHOLD = 0.8
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Advanced Duplicate File Finder")
@@ -134,6 +575,17 @@ class AdvancedDuplicateFileFinder(QMainWindow):
         # Undo stack
         self.undo_stack = []
 
+        # Results database backing the results pane
+        self.results_store = None
+        self.results_temp_path = None
+        self.results_cursor = None
+        self.has_more_results = False
+        self.results_filter_folder = None
+        self.results_filter_wasted = 0
+        self.live_group_limit = None
+        self.validated_groups = set()
+        self.loaded_groups = set()
+
     def setup_ui(self):
         # Top bar
         top_bar = QHBoxLayout()
@@ -153,6 +605,24 @@ class AdvancedDuplicateFileFinder(QMainWindow):
         filter_layout.addWidget(self.file_type_filter)
         self.main_layout.addLayout(filter_layout)
 
+        # Scan budget
+        budget_layout = QHBoxLayout()
+        self.time_budget_input = QLineEdit()
+        self.time_budget_input.setPlaceholderText("Seconds (optional)")
+        self.byte_budget_input = QLineEdit()
+        self.byte_budget_input.setPlaceholderText("MB to read (optional)")
+        budget_layout.addWidget(QLabel("Scan Budget:"))
+        budget_layout.addWidget(self.time_budget_input)
+        budget_layout.addWidget(self.byte_budget_input)
+        self.memory_cap_input = QLineEdit()
+        self.memory_cap_input.setPlaceholderText("Memory cap MB (optional)")
+        budget_layout.addWidget(self.memory_cap_input)
+        self.parallel_walk_checkbox = QCheckBox("Parallel folder listing (network drives)")
+        budget_layout.addWidget(self.parallel_walk_checkbox)
+        self.similarity_checkbox = QCheckBox("Find similar text files")
+        budget_layout.addWidget(self.similarity_checkbox)
+        self.main_layout.addLayout(budget_layout)
+
         # Main content
         content_splitter = QSplitter(Qt.Orientation.Horizontal)
         self.main_layout.addWidget(content_splitter)
@@ -187,8 +657,23 @@ class AdvancedDuplicateFileFinder(QMainWindow):
         self.tree.setColumnWidth(0, 200)
         self.tree.setColumnWidth(1, 100)
         self.tree.itemSelectionChanged.connect(self.update_preview)
+        self.tree.itemExpanded.connect(self.revalidate_group_item)
+        self.tree.verticalScrollBar().valueChanged.connect(self.results_scrolled)
         left_layout.addWidget(self.tree)
 
+        # Results filter
+        results_filter_layout = QHBoxLayout()
+        self.results_folder_filter = QLineEdit()
+        self.results_folder_filter.setPlaceholderText("Only groups with files in this folder")
+        self.results_folder_filter.returnPressed.connect(self.apply_results_filter)
+        self.results_min_wasted = QLineEdit()
+        self.results_min_wasted.setPlaceholderText("Min. wasted MB")
+        self.results_min_wasted.returnPressed.connect(self.apply_results_filter)
+        results_filter_layout.addWidget(QLabel("Show:"))
+        results_filter_layout.addWidget(self.results_folder_filter)
+        results_filter_layout.addWidget(self.results_min_wasted)
+        left_layout.addLayout(results_filter_layout)
+
         # Delete buttons
         delete_layout = QHBoxLayout()
         self.delete_selected_button = AnimatedButton("Delete Selected")
@@ -209,6 +694,19 @@ class AdvancedDuplicateFileFinder(QMainWindow):
         self.undo_button.setVisible(False)
         left_layout.addWidget(self.undo_button)
 
+        # Saved results
+        results_layout = QHBoxLayout()
+        self.save_results_button = AnimatedButton("Save Results")
+        self.save_results_button.clicked.connect(self.save_results)
+        results_layout.addWidget(self.save_results_button)
+        self.open_results_button = AnimatedButton("Open Results")
+        self.open_results_button.clicked.connect(self.open_results)
+        results_layout.addWidget(self.open_results_button)
+        self.export_results_button = AnimatedButton("Export Results")
+        self.export_results_button.clicked.connect(self.export_results)
+        results_layout.addWidget(self.export_results_button)
+        left_layout.addLayout(results_layout)
+
         content_splitter.addWidget(left_panel)
 
         # Right panel
@@ -388,7 +886,34 @@ class AdvancedDuplicateFileFinder(QMainWindow):
             QMessageBox.warning(self, "Error", "Please select a folder first.")
             return
 
+        try:
+            time_budget = float(self.time_budget_input.text()) if self.time_budget_input.text() else None
+            byte_budget = int(float(self.byte_budget_input.text()) * 1024 * 1024) if self.byte_budget_input.text() else None
+        except ValueError:
+            QMessageBox.warning(self, "Error", "Scan budget must be a number.")
+            return
+        try:
+            memory_cap = int(float(self.memory_cap_input.text()) * 1024 * 1024) if self.memory_cap_input.text() else None
+        except ValueError:
+            QMessageBox.warning(self, "Error", "Memory cap must be a number.")
+            return
+
         self.tree.clear()
+        self.loaded_groups = set()
+        self.unverified = None
+        self.has_more_results = False
+        fd, temp_path = tempfile.mkstemp(prefix="duplicate_results_", suffix=".db")
+        os.close(fd)
+        self.set_results_store(ResultsStore(temp_path, folder), temp_path)
+        # A filter left over from earlier results would otherwise apply to
+        # Delete All and Export while the list shows every group.
+        self.results_filter_folder = None
+        self.results_filter_wasted = 0
+        self.results_folder_filter.clear()
+        self.results_min_wasted.clear()
+        self.similar_count = 0
+        self.similarity_skipped = 0
+        self.live_group_limit = ResultsStore.PAGE_SIZE if memory_cap is not None else None
         self.progress_bar.setVisible(True)
         self.search_button.setEnabled(False)
         self.delete_selected_button.setVisible(False)
@@ -399,9 +924,27 @@ class AdvancedDuplicateFileFinder(QMainWindow):
         self.logger.info(f"Starting search in folder: {folder}")
         if file_types:
             self.logger.info(f"File types filter: {file_types}")
+        if time_budget is not None or byte_budget is not None:
+            self.logger.info(f"Scan budget: {time_budget} seconds, {byte_budget} bytes")
+
+        walk_workers = self.PARALLEL_WALK_WORKERS if self.parallel_walk_checkbox.isChecked() else None
+        if walk_workers:
+            self.logger.info(f"Parallel folder listing with {walk_workers} workers")
+
+        similarity_threshold = self.SIMILARITY_THRESHOLD if self.similarity_checkbox.isChecked() else None
+        if similarity_threshold is not None:
+            self.logger.info(f"Looking for similar text files (threshold {similarity_threshold})")
 
-        self.file_hasher = FileHasher(folder, file_types)
+        if memory_cap is not None:
+            self.logger.info(f"Grouping on disk with a memory cap of {memory_cap} bytes")
+
+        self.file_hasher = FileHasher(folder, file_types, time_budget, byte_budget, walk_workers,
+                                      similarity_threshold, memory_cap)
         self.file_hasher.progress.connect(self.update_progress)
+        self.file_hasher.groups_found.connect(self.add_result_groups)
+        self.file_hasher.budget_exhausted.connect(self.budget_exhausted)
+        self.file_hasher.similar_found.connect(self.add_similar_clusters)
+        self.file_hasher.similarity_cut_short.connect(self.similarity_cut_short)
         self.file_hasher.finished.connect(self.search_completed)
         
         self.thread = QThread()
@@ -412,10 +955,18 @@ class AdvancedDuplicateFileFinder(QMainWindow):
     def update_progress(self, value):
         self.progress_bar.setValue(value)
 
-    def search_completed(self, duplicates):
+    def budget_exhausted(self, unverified_files, potential_bytes):
+        self.unverified = (unverified_files, potential_bytes)
+
+    def similarity_cut_short(self, skipped_files):
+        self.similarity_skipped = skipped_files
+
+    def search_completed(self, group_count):
         self.thread.quit()
         self.thread.wait()
-        self.display_results(duplicates)
+        if self.live_group_limit is not None:
+            self.reload_results()
+        self.display_results(group_count)
         self.update_disk_space_info()
         self.logger.info("Search completed")
 
@@ -428,39 +979,241 @@ class AdvancedDuplicateFileFinder(QMainWindow):
         self.search_button.setEnabled(True)
         self.logger.info("Search cancelled by user")
 
-    def display_results(self, duplicates):
+    def add_result_groups(self, groups):
+        group_ids = self.results_store.add_groups("duplicate", [(None, files) for files in groups])
+        for group_id, files in zip(group_ids, groups):
+            # Under a memory cap the list only takes the first page while scanning;
+            # the rest is paged in from the store once the scan is done.
+            if self.live_group_limit is not None and self.tree.topLevelItemCount() >= self.live_group_limit:
+                break
+            self.add_group_item(group_id, "duplicate", files)
+
+        # Let the user start reviewing and deleting while the scan is still running
+        if self.tree.topLevelItemCount() > 0:
+            self.delete_selected_button.setVisible(True)
+            self.delete_all_button.setVisible(True)
+
+    def add_similar_clusters(self, clusters):
+        group_ids = self.results_store.add_groups("similar", clusters)
+        for group_id, (score, files) in zip(group_ids, clusters):
+            self.add_group_item(group_id, "similar", files, score)
+        self.similar_count += len(clusters)
+
+    def add_group_item(self, group_id, kind, files, score=None):
+        # A group streamed in during the scan can come round again in a later page
+        if group_id in self.loaded_groups:
+            return
+        self.loaded_groups.add(group_id)
+        group_item = QTreeWidgetItem(self.tree)
+        group_item.setFont(0, QFont("Arial", 10, QFont.Weight.Bold))
+        group_item.setData(0, Qt.ItemDataRole.UserRole, kind)
+        group_item.setData(1, Qt.ItemDataRole.UserRole, group_id)
+        group_item.setData(2, Qt.ItemDataRole.UserRole, score)
+        # Near-duplicates are only listed for review, never bulk deleted
+        if kind == "duplicate":
+            checkbox = QCheckBox()
+            self.tree.setItemWidget(group_item, 2, checkbox)
+        for filepath, size in files:
+            file_item = QTreeWidgetItem(group_item)
+            file_item.setText(0, os.path.basename(filepath))
+            file_item.setText(1, f"{size/1024:.2f} KB")
+            file_item.setText(2, filepath)
+        self.set_group_label(group_item)
+
+    def set_group_label(self, group_item):
+        if self.is_similarity_group(group_item):
+            score = group_item.data(2, Qt.ItemDataRole.UserRole)
+            group_item.setText(0, f"Similar Files ({group_item.childCount()} files, ~{score:.0%} similar)")
+        else:
+            group_item.setText(0, f"Duplicate Group ({group_item.childCount()} files)")
+
+    def is_similarity_group(self, group_item):
+        return group_item.data(0, Qt.ItemDataRole.UserRole) == "similar"
+
+    def display_results(self, group_count):
         self.progress_bar.setVisible(False)
         self.search_button.setEnabled(True)
 
-        if not duplicates:
+        if self.unverified or self.similarity_skipped:
+            message = f"Confirmed {group_count} duplicate groups."
+            if self.unverified:
+                unverified_files, potential_bytes = self.unverified
+                message += (f"\n\n{unverified_files} files were not verified; they could free up to "
+                            f"{potential_bytes/1e9:.2f} GB more.")
+                self.logger.info(f"Scan budget reached with {unverified_files} unverified files "
+                                 f"({potential_bytes} potential bytes)")
+            if self.similarity_skipped:
+                message += f"\n\n{self.similarity_skipped} text files were not compared for similarity."
+                self.logger.info(f"Scan budget reached with {self.similarity_skipped} text files "
+                                 f"not compared for similarity")
+            QMessageBox.information(self, "Scan Budget Reached", message)
+        elif not group_count and not self.similar_count:
             QMessageBox.information(self, "Result", "No duplicates found.")
             return
 
-        for file_hash, files in duplicates.items():
-            if len(files) > 1:
-                group_item = QTreeWidgetItem(self.tree)
-                group_item.setText(0, f"Duplicate Group ({len(files)} files)")
-                group_item.setFont(0, QFont("Arial", 10, QFont.Weight.Bold))
-                checkbox = QCheckBox()
-                self.tree.setItemWidget(group_item, 2, checkbox)
-                for filepath, size in files:
-                    file_item = QTreeWidgetItem(group_item)
-                    file_item.setText(0, os.path.basename(filepath))
-                    file_item.setText(1, f"{size/1024:.2f} KB")
-                    file_item.setText(2, filepath)
+        self.logger.info(f"Found {group_count} duplicate groups")
+        if self.similar_count:
+            self.logger.info(f"Found {self.similar_count} similar file clusters")
+
+    def set_results_store(self, store, temp_path=None):
+        self.close_results_store()
+        self.results_store = store
+        self.results_temp_path = temp_path
+        self.validated_groups = set()
+        self.loaded_groups = set()
+
+    def close_results_store(self):
+        if self.results_store:
+            self.results_store.close()
+            self.results_store = None
+        if self.results_temp_path:
+            try:
+                os.remove(self.results_temp_path)
+            except OSError as e:
+                self.logger.error(f"Error removing {self.results_temp_path}: {str(e)}")
+            self.results_temp_path = None
+
+    def is_scanning(self):
+        return hasattr(self, 'thread') and self.thread.isRunning()
+
+    def reload_results(self):
+        self.tree.clear()
+        self.loaded_groups = set()
+        self.results_cursor = None
+        self.has_more_results = True
+        self.fill_results_view()
+
+    def fill_results_view(self):
+        # Next pages are fetched on scroll, so keep loading until the list can
+        # actually scroll or they could never be reached.
+        while self.has_more_results:
+            self.load_results_page()
+            self.tree.doItemsLayout()
+            if self.tree.verticalScrollBar().maximum() > 0:
+                break
+
+    def load_results_page(self):
+        if not self.results_store or not self.has_more_results:
+            return
+
+        rows = self.results_store.query_groups(self.results_filter_folder, self.results_filter_wasted,
+                                               self.results_cursor, ResultsStore.PAGE_SIZE).fetchall()
+        for group_id, kind, size, file_count, wasted, score in rows:
+            self.add_group_item(group_id, kind, self.results_store.group_files(group_id), score)
+        if rows:
+            self.results_cursor = (rows[-1][4], rows[-1][0])
+        self.has_more_results = len(rows) == ResultsStore.PAGE_SIZE
 
         if self.tree.topLevelItemCount() > 0:
             self.delete_selected_button.setVisible(True)
             self.delete_all_button.setVisible(True)
 
-        self.logger.info(f"Found {self.tree.topLevelItemCount()} duplicate groups")
+    def results_scrolled(self, value):
+        if self.has_more_results and value >= self.tree.verticalScrollBar().maximum():
+            self.load_results_page()
+
+    def apply_results_filter(self):
+        if not self.results_store:
+            return
+        if self.is_scanning():
+            QMessageBox.warning(self, "Error", "Please wait for the search to finish before filtering results.")
+            return
+        try:
+            min_wasted = int(float(self.results_min_wasted.text()) * 1024 * 1024) if self.results_min_wasted.text() else 0
+        except ValueError:
+            QMessageBox.warning(self, "Error", "Minimum wasted space must be a number.")
+            return
+        self.results_filter_folder = self.results_folder_filter.text() or None
+        self.results_filter_wasted = min_wasted
+        self.reload_results()
+
+    def revalidate_group_item(self, group_item, force=False):
+        # Saved results can be old, so each group is checked against the disk the
+        # first time it's opened rather than all at once when the results load.
+        # Deletion passes force so files edited after that first check are caught.
+        group_id = group_item.data(1, Qt.ItemDataRole.UserRole)
+        if not self.results_store or group_id is None:
+            return
+        if group_id in self.validated_groups and not force:
+            return
+        self.validated_groups.add(group_id)
+
+        stale = set(self.results_store.revalidate_group(group_id))
+        if not stale:
+            return
+        self.logger.info(f"Dropped {len(stale)} changed or missing files from the results")
+        for j in range(group_item.childCount() - 1, -1, -1):
+            if group_item.child(j).text(2) in stale:
+                group_item.removeChild(group_item.child(j))
+        if group_item.childCount() < 2:
+            self.tree.invisibleRootItem().removeChild(group_item)
+            self.fill_results_view()
+        else:
+            self.set_group_label(group_item)
+
+    def save_results(self):
+        if not self.results_store:
+            QMessageBox.warning(self, "Error", "There are no results to save yet.")
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Save Results", "", "Results Database (*.db)")
+        if not path:
+            return
+        try:
+            self.results_store.save_as(path)
+            self.logger.info(f"Saved results to {path}")
+        except Exception as e:
+            QMessageBox.warning(self, "Error", f"Could not save results: {str(e)}")
+            self.logger.error(f"Error saving results to {path}: {str(e)}")
+
+    def open_results(self):
+        if self.is_scanning():
+            QMessageBox.warning(self, "Error", "Please wait for the search to finish before opening results.")
+            return
+        path, _ = QFileDialog.getOpenFileName(self, "Open Results", "", "Results Database (*.db)")
+        if not path:
+            return
+        try:
+            store = ResultsStore(path)
+        except Exception as e:
+            QMessageBox.warning(self, "Error", f"Could not open results: {str(e)}")
+            self.logger.error(f"Error opening results from {path}: {str(e)}")
+            return
+
+        self.set_results_store(store)
+        folder = store.get_meta("folder")
+        if folder:
+            self.folder_label.setText(folder)
+            self.update_disk_space_info()
+        self.results_filter_folder = None
+        self.results_filter_wasted = 0
+        self.results_folder_filter.clear()
+        self.results_min_wasted.clear()
+        self.reload_results()
+        self.logger.info(f"Opened results from {path}")
+
+    def export_results(self):
+        if not self.results_store:
+            QMessageBox.warning(self, "Error", "There are no results to export yet.")
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Export Results", "", "NDJSON (*.ndjson);;CSV (*.csv)")
+        if not path:
+            return
+        try:
+            if path.lower().endswith(".csv"):
+                self.results_store.export_csv(path, self.results_filter_folder, self.results_filter_wasted)
+            else:
+                self.results_store.export_ndjson(path, self.results_filter_folder, self.results_filter_wasted)
+            self.logger.info(f"Exported results to {path}")
+        except Exception as e:
+            QMessageBox.warning(self, "Error", f"Could not export results: {str(e)}")
+            self.logger.error(f"Error exporting results to {path}: {str(e)}")
 
     def delete_selected_duplicates(self):
         selected_groups = []
         for i in range(self.tree.topLevelItemCount()):
             group_item = self.tree.topLevelItem(i)
             checkbox = self.tree.itemWidget(group_item, 2)
-            if checkbox.isChecked():
+            if checkbox and checkbox.isChecked():
                 selected_groups.append(group_item)
 
         if not selected_groups:
@@ -474,14 +1227,46 @@ class AdvancedDuplicateFileFinder(QMainWindow):
             self.delete_duplicates(selected_groups)
 
     def delete_all_duplicates(self):
+        if not self.results_store:
+            return
+        # Go through the store rather than the list, which may only hold the first pages
+        filtered = self.results_filter_folder or self.results_filter_wasted
+        group_count = self.results_store.count_groups(self.results_filter_folder, self.results_filter_wasted,
+                                                      "duplicate")
+        scope = " that match the current filter" if filtered else ""
         reply = QMessageBox.question(self, "Confirm Deletion", 
-                                     "Are you sure you want to delete all duplicates except the first one in each group?",
+                                     f"Are you sure you want to delete all duplicates except the first one in each of "
+                                     f"the {group_count} duplicate groups{scope}, including groups not shown in the list yet?",
                                      QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
-        if reply == QMessageBox.StandardButton.Yes:
-            all_groups = [self.tree.topLevelItem(i) for i in range(self.tree.topLevelItemCount())]
-            self.delete_duplicates(all_groups)
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+
+        files_to_delete = []
+        cursor = None
+        checked_groups = set()
+        while True:
+            rows = self.results_store.query_groups(self.results_filter_folder, self.results_filter_wasted,
+                                                   cursor, ResultsStore.PAGE_SIZE, "duplicate").fetchall()
+            if not rows:
+                break
+            cursor = (rows[-1][4], rows[-1][0])
+            for group_id, kind, size, file_count, wasted, score in rows:
+                # Revalidating can lower a group's wasted space and bring it round again
+                if group_id in checked_groups:
+                    continue
+                checked_groups.add(group_id)
+                self.results_store.revalidate_group(group_id)
+                files = self.results_store.group_files(group_id)
+                files_to_delete.extend(filepath for filepath, _ in files[1:])
+
+        self.remove_duplicate_files(files_to_delete, reload=True)
 
     def delete_duplicates(self, groups):
+        # Never delete a file that changed since it was found to be a duplicate
+        for group_item in groups:
+            self.revalidate_group_item(group_item, force=True)
+        groups = [group_item for group_item in groups if group_item.treeWidget() is not None]
+
         files_to_delete = []
         for group_item in groups:
             for j in range(1, group_item.childCount()):  # Start from 1 to keep the first file
@@ -489,15 +1274,25 @@ class AdvancedDuplicateFileFinder(QMainWindow):
                 filepath = file_item.text(2)
                 files_to_delete.append(filepath)
 
-        deleted_count = 0
+        self.remove_duplicate_files(files_to_delete)
+
+    def remove_duplicate_files(self, files_to_delete, reload=False):
+        deleted_files = []
         for filepath in files_to_delete:
             try:
                 os.remove(filepath)
-                deleted_count += 1
+                deleted_files.append(filepath)
             except Exception as e:
                 self.logger.error(f"Error deleting {filepath}: {str(e)}")
+        deleted_count = len(deleted_files)
+        if self.results_store:
+            self.results_store.remove_files(deleted_files)
 
-        self.update_tree_after_deletion()
+        if reload:
+            self.reload_results()
+        else:
+            self.update_tree_after_deletion()
+            self.fill_results_view()
         self.update_disk_space_info()
 
         QMessageBox.information(self, "Deletion Complete", f"{deleted_count} duplicate files have been deleted.")
@@ -554,6 +1349,9 @@ class AdvancedDuplicateFileFinder(QMainWindow):
             return
 
         file_item = selected_items[0]
+        self.revalidate_group_item(file_item.parent() or file_item)
+        if file_item.treeWidget() is None:  # Dropped as changed or missing
+            return
         if file_item.parent() is None:  # It's a group item
             self.preview_content.setText("Select a file to preview its contents.")
             self.details_list.clear()
@@ -661,6 +1459,7 @@ class AdvancedDuplicateFileFinder(QMainWindow):
                                      QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, QMessageBox.StandardButton.No)
 
         if reply == QMessageBox.StandardButton.Yes:
+            self.close_results_store()
             self.logger.info("Application closed")
             event.accept()
         else:
@@ -0,0 +1,140 @@
+import os
+import sys
+import heapq
+import struct
+import tempfile
+
+# Sizes are stored negated so every sorted pass visits the largest files first
+SIZE_RECORD = "<qQQQ"       # -size, st_dev, st_ino, path id
+HASH_RECORD = "<q32sQQQ"    # -size, sha256 digest, st_dev, st_ino, path id
+
+# Python's allocator hands out memory in 16-byte steps
+ALLOCATION_STEP = 16
+# Pointer in the run buffer, with room for list over-allocation and sort scratch space
+LIST_SLOT = 16
+MIN_RUN_RECORDS = 1000
+FAN_IN = 64
+
+class PathSpool:
+    # Paths live on disk; records only carry the offset of their path here
+    LENGTH = struct.Struct("<I")
+
+    def __init__(self, temp_dir):
+        self.file = open(os.path.join(temp_dir, "paths"), "w+b")
+
+    def add(self, path):
+        self.file.seek(0, os.SEEK_END)
+        offset = self.file.tell()
+        data = os.fsencode(path)
+        self.file.write(self.LENGTH.pack(len(data)))
+        self.file.write(data)
+        return offset
+
+    def get(self, path_id):
+        self.file.seek(path_id)
+        length, = self.LENGTH.unpack(self.file.read(self.LENGTH.size))
+        return os.fsdecode(self.file.read(length))
+
+    def close(self):
+        self.file.close()
+
+class ExternalSorter:
+    def __init__(self, record_format, temp_dir, memory_cap):
+        self.record = struct.Struct(record_format)
+        self.temp_dir = temp_dir
+        # Half of the cap goes to the in-memory run, the other half to the read
+        # buffers of the runs being merged.
+        self.max_records = max(MIN_RUN_RECORDS, memory_cap // 2 // record_cost(self.record))
+        self.read_size = max(self.record.size, memory_cap // 2 // FAN_IN // self.record.size * self.record.size)
+        self.buffer = []
+        self.runs = []
+        self.count = 0
+
+    def add(self, record):
+        self.buffer.append(record)
+        self.count += 1
+        if len(self.buffer) >= self.max_records:
+            self.spill()
+
+    def spill(self):
+        self.buffer.sort()
+        self.runs.append(self.write_run(self.buffer))
+        self.buffer = []
+
+    def write_run(self, records):
+        fd, path = tempfile.mkstemp(suffix=".run", dir=self.temp_dir)
+        with os.fdopen(fd, "wb") as f:
+            for record in records:
+                f.write(self.record.pack(*record))
+        return path
+
+    def read_run(self, path):
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(self.read_size)
+                if not chunk:
+                    return
+                yield from self.record.iter_unpack(chunk)
+
+    def sorted_records(self):
+        if not self.runs:
+            self.buffer.sort()
+            records, self.buffer = self.buffer, []
+            yield from records
+            return
+
+        if self.buffer:
+            self.spill()
+        # Merge in several passes when there are too many runs to keep open at once
+        while len(self.runs) > FAN_IN:
+            merged = []
+            for start in range(0, len(self.runs), FAN_IN):
+                batch = self.runs[start:start + FAN_IN]
+                merged.append(self.write_run(heapq.merge(*[self.read_run(path) for path in batch])))
+                for path in batch:
+                    os.remove(path)
+            self.runs = merged
+        yield from heapq.merge(*[self.read_run(path) for path in self.runs])
+
+    def close(self):
+        for path in self.runs:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.runs = []
+        self.buffer = []
+
+def record_cost(record):
+    # Memory one buffered record takes as a tuple, measured on the largest values
+    # the format can hold: the tuple itself, each int or bytes object in it, and
+    # its slot in the run buffer.
+    sample = record.unpack(b"\xff" * record.size)
+    objects = [sample, *sample]
+    return LIST_SLOT + sum(-(-sys.getsizeof(obj) // ALLOCATION_STEP) * ALLOCATION_STEP for obj in objects)
+
+def collisions(records, key):
+    # Yields only the records that share their key with a neighbour in a sorted stream
+    previous = None
+    previous_key = None
+    previous_sent = False
+    for record in records:
+        record_key = key(record)
+        if previous is not None and record_key == previous_key:
+            if not previous_sent:
+                yield previous
+            yield record
+            previous_sent = True
+        else:
+            previous_sent = False
+        previous, previous_key = record, record_key
+
+def distinct_inodes(records):
+    # Hard links sort next to each other; keeps the first path found for each inode
+    last_inode = None
+    for record in records:
+        inode = record[-3:-1]
+        if record[-2] and inode == last_inode:
+            continue
+        last_inode = inode
+        yield record
@@ -0,0 +1,199 @@
+import os
+import csv
+import json
+import time
+import sqlite3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS groups (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    file_count INTEGER NOT NULL,
+    wasted INTEGER NOT NULL,
+    score REAL
+);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    group_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    directory TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL
+);
+CREATE INDEX IF NOT EXISTS groups_by_wasted_id ON groups (wasted DESC, id DESC);
+CREATE INDEX IF NOT EXISTS files_by_group ON files (group_id, position);
+CREATE INDEX IF NOT EXISTS files_by_directory ON files (directory);
+CREATE INDEX IF NOT EXISTS files_by_path ON files (path);
+"""
+
+def file_mtime(filepath):
+    try:
+        return os.stat(filepath).st_mtime
+    except OSError:
+        return None
+
+class ResultsStore:
+    PAGE_SIZE = 200
+
+    def __init__(self, db_path, folder=None):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        if folder is None:
+            # Opening a saved file must never write to it, in case it's some other database
+            try:
+                self.check_schema()
+            except Exception:
+                self.conn.close()
+                raise
+            return
+        self.conn.executescript(SCHEMA)
+        self.set_meta("folder", folder)
+        self.set_meta("scanned_at", str(time.time()))
+        self.conn.commit()
+
+    def check_schema(self):
+        tables = {row[0] for row in self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        if not {"meta", "groups", "files"} <= tables or self.get_meta("scanned_at") is None:
+            raise ValueError(f"{self.db_path} is not a saved results database")
+
+    def set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def get_meta(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def add_groups(self, kind, groups):
+        # groups is a list of (score, [(filepath, size), ...]); score is None for exact duplicates
+        group_ids = []
+        with self.conn:
+            for score, files in groups:
+                size = max(size for _, size in files)
+                wasted = size * (len(files) - 1) if kind == "duplicate" else 0
+                cursor = self.conn.execute(
+                    "INSERT INTO groups (kind, size, file_count, wasted, score) VALUES (?, ?, ?, ?, ?)",
+                    (kind, size, len(files), wasted, score))
+                group_id = cursor.lastrowid
+                self.conn.executemany(
+                    "INSERT INTO files (group_id, position, path, directory, size, mtime) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(group_id, position, filepath, os.path.dirname(filepath), file_size, file_mtime(filepath))
+                     for position, (filepath, file_size) in enumerate(files)])
+                group_ids.append(group_id)
+        return group_ids
+
+    def group_conditions(self, directory=None, min_wasted=0, kind=None):
+        conditions = ["wasted >= ?"]
+        params = [min_wasted]
+        if kind is not None:
+            conditions.append("kind = ?")
+            params.append(kind)
+        if directory:
+            directory = directory.rstrip("/\\") or directory
+            conditions.append("id IN (SELECT group_id FROM files WHERE directory = ? "
+                              "OR (directory >= ? AND directory < ?))")
+            params.extend([directory, directory + os.sep, directory + chr(ord(os.sep) + 1)])
+        return conditions, params
+
+    def query_groups(self, directory=None, min_wasted=0, after=None, limit=None, kind=None):
+        # Pages are keyed on (wasted, id) rather than OFFSET, and that order matches
+        # groups_by_wasted_id exactly, so each page is read straight off the index
+        # without sorting the groups that are left.
+        conditions, params = self.group_conditions(directory, min_wasted, kind)
+        if after is not None:
+            conditions.append("(wasted, id) < (?, ?)")
+            params.extend(after)
+        query = (f"SELECT id, kind, size, file_count, wasted, score FROM groups "
+                 f"WHERE {' AND '.join(conditions)} ORDER BY wasted DESC, id DESC")
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        return self.conn.execute(query, params)
+
+    def count_groups(self, directory=None, min_wasted=0, kind=None):
+        conditions, params = self.group_conditions(directory, min_wasted, kind)
+        return self.conn.execute(f"SELECT COUNT(*) FROM groups WHERE {' AND '.join(conditions)}",
+                                 params).fetchone()[0]
+
+    def group_files(self, group_id):
+        return self.conn.execute("SELECT path, size FROM files WHERE group_id = ? ORDER BY position",
+                                 (group_id,)).fetchall()
+
+    def revalidate_group(self, group_id):
+        # A file that is gone or whose size or mtime differs from what was recorded
+        # at scan time can no longer be trusted to match the rest of its group.
+        # Comparing each file with its own mtime keeps clock skew out of it.
+        stale = []
+        rows = self.conn.execute("SELECT path, size, mtime FROM files WHERE group_id = ? ORDER BY position",
+                                 (group_id,)).fetchall()
+        for filepath, size, mtime in rows:
+            try:
+                st = os.stat(filepath)
+                if st.st_size != size or st.st_mtime != mtime:
+                    stale.append(filepath)
+            except OSError:
+                stale.append(filepath)
+        if stale:
+            self.remove_files(stale, group_id)
+        return stale
+
+    def remove_files(self, paths, group_id=None):
+        with self.conn:
+            group_ids = set()
+            for filepath in paths:
+                if group_id is None:
+                    rows = self.conn.execute("SELECT group_id FROM files WHERE path = ?", (filepath,)).fetchall()
+                    group_ids.update(row[0] for row in rows)
+                    self.conn.execute("DELETE FROM files WHERE path = ?", (filepath,))
+                else:
+                    self.conn.execute("DELETE FROM files WHERE path = ? AND group_id = ?", (filepath, group_id))
+            if group_id is not None:
+                group_ids.add(group_id)
+            for affected in group_ids:
+                self.refresh_group(affected)
+
+    def refresh_group(self, group_id):
+        count, size = self.conn.execute("SELECT COUNT(*), MAX(size) FROM files WHERE group_id = ?",
+                                        (group_id,)).fetchone()
+        if count < 2:
+            self.conn.execute("DELETE FROM files WHERE group_id = ?", (group_id,))
+            self.conn.execute("DELETE FROM groups WHERE id = ?", (group_id,))
+        else:
+            self.conn.execute("UPDATE groups SET file_count = ?, size = ?, "
+                              "wasted = CASE kind WHEN 'duplicate' THEN ? ELSE 0 END WHERE id = ?",
+                              (count, size, size * (count - 1), group_id))
+
+    def iter_groups(self, directory=None, min_wasted=0):
+        # Reads one group's files at a time so exports never hold the whole result set
+        for group_id, kind, size, file_count, wasted, score in self.query_groups(directory, min_wasted):
+            yield group_id, kind, size, wasted, score, self.group_files(group_id)
+
+    def export_ndjson(self, path, directory=None, min_wasted=0):
+        with open(path, "w", encoding="utf-8") as f:
+            for group_id, kind, size, wasted, score, files in self.iter_groups(directory, min_wasted):
+                f.write(json.dumps({"group": group_id, "kind": kind, "size": size, "wasted": wasted,
+                                    "score": score, "files": [filepath for filepath, _ in files]}) + "\n")
+
+    def export_csv(self, path, directory=None, min_wasted=0):
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["group", "kind", "score", "wasted", "path", "size"])
+            for group_id, kind, size, wasted, score, files in self.iter_groups(directory, min_wasted):
+                for filepath, file_size in files:
+                    writer.writerow([group_id, kind, score, wasted, filepath, file_size])
+
+    def save_as(self, path):
+        self.conn.commit()
+        target = sqlite3.connect(path)
+        try:
+            self.conn.backup(target)
+        finally:
+            target.close()
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,116 @@
+import os
+import re
+from collections import defaultdict
+import numpy as np
+
+TEXT_EXTENSIONS = {'.txt', '.md', '.rst', '.csv', '.tsv', '.json', '.xml', '.yaml', '.yml',
+                   '.ini', '.cfg', '.conf', '.toml', '.log', '.html', '.htm'}
+MAX_TEXT_SIZE = 16 * 1024 * 1024
+
+SHINGLE_SIZE = 5
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+CHUNK_SIZE = 8192
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+
+# Fixed seed so signatures from different scans can be compared with each other
+_rng = np.random.default_rng(1)
+_A = _rng.integers(1, 1 << 31, size=NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+
+def is_text_file(filename):
+    return os.path.splitext(filename)[1].lower() in TEXT_EXTENSIONS
+
+def read_text(filepath):
+    with open(filepath, "rb") as f:
+        data = f.read(MAX_TEXT_SIZE)
+    # Ignore case and whitespace changes so re-indented or re-wrapped copies still match
+    return re.sub(rb'\s+', b' ', data.lower()).strip()
+
+def shingle_hashes(data):
+    arr = np.frombuffer(data, dtype=np.uint8).astype(np.uint32)
+    if len(arr) <= SHINGLE_SIZE:
+        count = 1
+        width = len(arr)
+    else:
+        count = len(arr) - SHINGLE_SIZE + 1
+        width = SHINGLE_SIZE
+    # Polynomial hash of every byte window, built up one offset at a time so
+    # memory stays linear in the file size. uint32 arithmetic wraps on purpose.
+    hashes = np.zeros(count, dtype=np.uint32)
+    for offset in range(width):
+        hashes = hashes * np.uint32(16777619) + arr[offset:offset + count]
+    return np.unique(hashes).astype(np.uint64)
+
+def minhash_signature(data):
+    if not data:
+        return None
+    shingles = shingle_hashes(data)
+    signature = np.full(NUM_PERM, MERSENNE_PRIME, dtype=np.uint64)
+    for start in range(0, len(shingles), CHUNK_SIZE):
+        chunk = shingles[start:start + CHUNK_SIZE]
+        hashes = (_A[:, None] * chunk[None, :] + _B[:, None]) % MERSENNE_PRIME
+        np.minimum(signature, hashes.min(axis=1), out=signature)
+    return signature
+
+def estimate_jaccard(signature, other):
+    return float(np.count_nonzero(signature == other)) / NUM_PERM
+
+def find_similar_clusters(signatures, threshold):
+    # signatures is a list of (item, signature). Only items sharing at least one
+    # LSH band are compared, so the cost grows with the number of near matches
+    # rather than with every pair of files.
+    buckets = defaultdict(list)
+    for index, (_, signature) in enumerate(signatures):
+        for band in range(BANDS):
+            buckets[(band, signature[band * ROWS:(band + 1) * ROWS].tobytes())].append(index)
+
+    parent = list(range(len(signatures)))
+
+    def find(index):
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    # Each member is compared with one representative of every cluster already in
+    # its bucket and joins the first that matches, so the cost grows with the
+    # number of distinct clusters per bucket rather than every pair in it.
+    edges = []
+    for members in buckets.values():
+        representatives = []
+        for index in members:
+            root = find(index)
+            checked = set()
+            matched = False
+            for other in representatives:
+                other_root = find(other)
+                if other_root == root:
+                    matched = True
+                    break
+                if other_root in checked:
+                    continue
+                checked.add(other_root)
+                score = estimate_jaccard(signatures[other][1], signatures[index][1])
+                if score >= threshold:
+                    edges.append((other, index, score))
+                    parent[root] = other_root
+                    matched = True
+                    break
+            if not matched:
+                representatives.append(index)
+
+    clusters = defaultdict(list)
+    scores = defaultdict(list)
+    for first, second, score in edges:
+        scores[find(first)].append(score)
+    for index in range(len(signatures)):
+        root = find(index)
+        if root in scores:
+            clusters[root].append(signatures[index][0])
+
+    results = [(sum(scores[root]) / len(scores[root]), items) for root, items in clusters.items()]
+    results.sort(key=lambda result: (-result[0], -len(result[1])))
+    return results